@@ -5,6 +5,11 @@ import pytz
 from sqlalchemy import types
 from sqlalchemy.orm.properties import RelationshipProperty, ColumnProperty
 
+try:
+    string_types = (basestring, )
+except NameError:
+    string_types = (str, bytes)
+
 
 missing = colander.null
 
@@ -74,6 +79,234 @@ class NullableSchemaNode(colander.SchemaNode):
         return super(NullableSchemaNode, self).deserialize(cstruct)
 
 
+class PayloadBudget(object):
+    """
+    Cheap upper bounds for incoming cstructs.
+
+    The budget walks the raw cstruct once before any coercion takes place
+    and raises :class:`colander.Invalid` as soon as one of the limits is
+    exceeded. Limits set to ``None`` are not enforced.
+
+    Mappings are detected by an ``items`` method and sequences by
+    ``__iter__`` and ``__len__``, so mapping types other than ``dict`` are
+    checked too.
+
+    :param max_size:
+        maximum total payload size, counted as the combined length of all
+        strings and mapping keys plus one for the payload itself and for
+        every mapping item and sequence element
+    :param max_depth: maximum nesting depth of mappings and sequences
+    :param max_sequence_length: maximum length of any single sequence
+    :param max_string_length:
+        maximum length of any single string, including mapping keys that
+        do not name a schema node. Nodes carrying their own ``max_length``
+        (generated from the column's ``type.length``) are limited to the
+        smaller of the two, or to ``max_length`` alone when this is not
+        set.
+    """
+    def __init__(self, max_size=None, max_depth=None,
+                 max_sequence_length=None, max_string_length=None):
+        self.max_size = max_size
+        self.max_depth = max_depth
+        self.max_sequence_length = max_sequence_length
+        self.max_string_length = max_string_length
+
+    def check(self, node, cstruct):
+        # The payload is walked with an explicit stack so that deeply nested
+        # input is rejected with Invalid instead of hitting the recursion
+        # limit. ``trail`` holds the ``(node, position)`` pairs of the
+        # schema nodes along ``path`` and is used to attach errors to the
+        # offending node.
+        size = self._consume(node, (), (), 0, 1)
+        stack = [(node, cstruct, (), (), 0)]
+        while stack:
+            child, cstruct, path, trail, depth = stack.pop()
+            size = self._check(
+                node, child, cstruct, path, trail, depth, size, stack
+            )
+
+    def _invalid(self, root, path, trail, msg):
+        unknown = path[len(trail):]
+        if unknown:
+            msg = '%s: %s' % ('.'.join(str(p) for p in unknown), msg)
+        if not trail:
+            raise colander.Invalid(root, msg)
+        error = colander.Invalid(trail[-1][0], msg)
+        parents = [root] + [node for node, pos in trail[:-1]]
+        for parent, (node, pos) in reversed(list(zip(parents, trail))):
+            parent_error = colander.Invalid(parent)
+            parent_error.add(error, pos)
+            error = parent_error
+        raise error
+
+    def _consume(self, root, path, trail, size, amount):
+        size += amount
+        if self.max_size is not None and size > self.max_size:
+            self._invalid(
+                root, path, trail,
+                'Payload larger than maximum size %d' % self.max_size
+            )
+        return size
+
+    def _check_depth(self, root, path, trail, depth):
+        if self.max_depth is not None and depth > self.max_depth:
+            self._invalid(
+                root, path, trail,
+                'Payload nested deeper than maximum depth %d' %
+                self.max_depth
+            )
+
+    def _check_length(self, root, path, trail, value, max_length, msg):
+        if max_length is not None and len(value) > max_length:
+            self._invalid(root, path, trail, msg % max_length)
+
+    def _child(self, node, key):
+        if node is not None:
+            for pos, child in enumerate(node.children):
+                if child.name == key:
+                    return pos, child
+        return None, None
+
+    def _check(self, root, node, cstruct, path, trail, depth, size, stack):
+        # Every mapping item and sequence element is charged one unit when
+        # it is pushed, so containers are never free.
+        if isinstance(cstruct, string_types):
+            max_length = getattr(node, 'max_length', None)
+            if max_length is None:
+                max_length = self.max_string_length
+            elif self.max_string_length is not None:
+                max_length = min(max_length, self.max_string_length)
+            self._check_length(
+                root, path, trail, cstruct, max_length,
+                'String longer than maximum length %d'
+            )
+            size = self._consume(root, path, trail, size, len(cstruct))
+        elif hasattr(cstruct, 'items'):
+            depth += 1
+            self._check_depth(root, path, trail, depth)
+            for key, value in cstruct.items():
+                pos, child = self._child(node, key)
+                if isinstance(key, string_types):
+                    if child is None:
+                        self._check_length(
+                            root, path, trail, key, self.max_string_length,
+                            'Key longer than maximum length %d'
+                        )
+                    key_size = len(key)
+                else:
+                    key_size = 1
+                size = self._consume(root, path, trail, size, 1 + key_size)
+                child_trail = trail
+                if child is not None and len(trail) == len(path):
+                    child_trail = trail + ((child, pos), )
+                stack.append(
+                    (child, value, path + (key, ), child_trail, depth)
+                )
+        elif hasattr(cstruct, '__iter__') and hasattr(cstruct, '__len__'):
+            depth += 1
+            self._check_depth(root, path, trail, depth)
+            self._check_length(
+                root, path, trail, cstruct, self.max_sequence_length,
+                'Sequence longer than maximum length %d'
+            )
+            child = None
+            if node is not None and isinstance(node.typ, colander.Sequence):
+                child = node.children[0]
+            for index, value in enumerate(cstruct):
+                size = self._consume(root, path, trail, size, 1)
+                child_trail = trail
+                if child is not None and len(trail) == len(path):
+                    child_trail = trail + ((child, index), )
+                stack.append(
+                    (child, value, path + (index, ), child_trail, depth)
+                )
+        return size
+
+
+class BudgetedSchemaNode(colander.SchemaNode):
+    """
+    Schema node that checks the cstruct against its ``budget`` (a
+    :class:`PayloadBudget`) before deserializing it.
+    """
+    budget = None
+
+    def deserialize(self, cstruct=colander.null):
+        if self.budget is not None:
+            self.budget.check(self, cstruct)
+        return super(BudgetedSchemaNode, self).deserialize(cstruct)
+
+
+class PartialSchemaNode(BudgetedSchemaNode):
+    """
+    Mapping schema node for PATCH-style updates.
+
+    Only the nodes for keys present in the cstruct are looked up (through a
+    name to node index) and deserialized, and only the submitted fields end
+    up in the appstruct. The schema level validator is run only when
+    ``partial_validate`` is set.
+    """
+    partial_validate = False
+    _index = None
+
+    def index(self):
+        if self._index is None:
+            self._index = dict(
+                (node.name, (pos, node))
+                for pos, node in enumerate(self.children)
+            )
+        return self._index
+
+    def add(self, node):
+        super(PartialSchemaNode, self).add(node)
+        self._index = None
+
+    def insert(self, index, node):
+        super(PartialSchemaNode, self).insert(index, node)
+        self._index = None
+
+    def __setitem__(self, name, newnode):
+        super(PartialSchemaNode, self).__setitem__(name, newnode)
+        self._index = None
+
+    def __delitem__(self, name):
+        super(PartialSchemaNode, self).__delitem__(name)
+        self._index = None
+
+    def clone(self):
+        cloned = super(PartialSchemaNode, self).clone()
+        cloned._index = None
+        return cloned
+
+    def deserialize(self, cstruct=colander.null):
+        if cstruct is colander.null or not hasattr(cstruct, 'items'):
+            return super(PartialSchemaNode, self).deserialize(cstruct)
+        if self.budget is not None:
+            self.budget.check(self, cstruct)
+
+        index = self.index()
+        error = None
+        appstruct = {}
+        for key, value in cstruct.items():
+            try:
+                pos, node = index[key]
+            except KeyError:
+                continue
+            try:
+                result = node.deserialize(value)
+                if result is not colander.drop:
+                    appstruct[key] = result
+            except colander.Invalid as e:
+                if error is None:
+                    error = colander.Invalid(self)
+                error.add(e, pos)
+        if error is not None:
+            raise error
+
+        if self.partial_validate and self.validator is not None:
+            self.validator(self, appstruct)
+        return appstruct
+
+
 class NaiveDateTime(colander.DateTime):
     """Converts deserialized datetimes to UTC and removes tzinfo."""
     def deserialize(self, node, cstruct):
@@ -85,6 +318,9 @@ class NaiveDateTime(colander.DateTime):
 
 class ColanderAlchemyMixin(object):
     __schema__ = {}
+    #: Payload budget options passed to the schema generator, for example
+    #: ``{'max_size': 100000, 'max_depth': 4}``.
+    __schema_budget__ = {}
 
     @classmethod
     def _schema_validate(cls, node, value):
@@ -97,7 +333,8 @@ class ColanderAlchemyMixin(object):
                name='',
                missing=colander.required,
                assign_defaults=True):
-        generator = cls.__schema_generator__(cls, missing, assign_defaults)
+        generator = cls.__schema_generator__(cls, missing, assign_defaults,
+                                             **cls.__schema_budget__)
         return generator.create(include, exclude, name)
 
     @classmethod
@@ -108,7 +345,8 @@ class ColanderAlchemyMixin(object):
             missing=colander.required,
             assign_defaults=True):
         generator = cls.__schema_generator__(cls, missing, assign_defaults,
-                                             cls._schema_validate)
+                                             cls._schema_validate,
+                                             **cls.__schema_budget__)
         return generator.create(include, exclude)
 
     @classmethod
@@ -117,9 +355,14 @@ class ColanderAlchemyMixin(object):
             include=None,
             exclude=None,
             missing=missing,
-            assign_defaults=False):
+            assign_defaults=False,
+            partial=False,
+            partial_validate=False):
         generator = cls.__schema_generator__(cls, missing, assign_defaults,
-                                             cls._schema_validate)
+                                             cls._schema_validate,
+                                             partial=partial,
+                                             partial_validate=partial_validate,
+                                             **cls.__schema_budget__)
         return generator.create(include, exclude)
 
     @classmethod
@@ -136,7 +379,8 @@ class ColanderAlchemyMixin(object):
             cls._schema_validate,
             only_indexed_fields=True,
             include_primary_keys=True,
-            include_relations=False
+            include_relations=False,
+            **cls.__schema_budget__
         )
         return generator.create(include, exclude)
 
@@ -168,7 +412,9 @@ class SchemaGenerator(object):
     def __init__(self, model_class, missing=colander.required,
                  assign_defaults=True, validator=None,
                  only_indexed_fields=False, include_primary_keys=False,
-                 include_relations=True):
+                 include_relations=True, max_size=None, max_depth=None,
+                 max_sequence_length=None, max_string_length=None,
+                 partial=False, partial_validate=False):
         self.validator = validator
         self.model_class = model_class
         self.missing = missing
@@ -176,20 +422,46 @@ class SchemaGenerator(object):
         self.only_indexed_fields = only_indexed_fields
         self.include_primary_keys = include_primary_keys
         self.include_relations = include_relations
+        self.partial = partial
+        self.partial_validate = partial_validate
+        self.skipped_columns = []
+        self.budget = None
+        if (max_size is not None or max_depth is not None or
+                max_sequence_length is not None or
+                max_string_length is not None):
+            self.budget = PayloadBudget(
+                max_size=max_size,
+                max_depth=max_depth,
+                max_sequence_length=max_sequence_length,
+                max_string_length=max_string_length
+            )
 
     def create(self, include=None, exclude=None, name=''):
-        colander_schema = colander.SchemaNode(
-            colander.Mapping(),
-            name=name,
-            missing=self.missing,
-            validator=self.validator
-        )
+        if self.partial:
+            colander_schema = PartialSchemaNode(
+                colander.Mapping(),
+                name=name,
+                missing=self.missing,
+                validator=self.validator,
+                budget=self.budget,
+                partial_validate=self.partial_validate
+            )
+        else:
+            colander_schema = BudgetedSchemaNode(
+                colander.Mapping(),
+                name=name,
+                missing=self.missing,
+                validator=self.validator,
+                budget=self.budget
+            )
 
         fields = set(self.model_class._sa_class_manager.values())
         tmp = []
+        self.skipped_columns = []
         for field in fields:
             column = field.property
             if isinstance(column, ColumnProperty) and self.skip_column(column):
+                self.skipped_columns.append(field.key)
                 continue
             tmp.append(field)
         fields = set(tmp)
@@ -322,7 +594,8 @@ class SchemaGenerator(object):
             colander_type,
             name=name,
             missing=default,
-            validator=validator
+            validator=validator,
+            max_length=getattr(column.type, 'length', None)
         )
 
     def length_validator(self, column):
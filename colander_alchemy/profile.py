@@ -0,0 +1,221 @@
+"""
+Profiles the schemas generated for a mapped model.
+
+Usage::
+
+    python -m colander_alchemy.profile package.module:Model
+    python -m colander_alchemy.profile package.module:Model \\
+        --payload payload.json --variant get_update_schema
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import importlib
+import inspect
+import json
+import sys
+from timeit import default_timer
+
+import colander
+
+from colander_alchemy import ColanderAlchemyMixin
+
+
+VARIANTS = (
+    'schema',
+    'get_create_schema',
+    'get_update_schema',
+    'get_search_schema'
+)
+
+
+def load_model(spec):
+    """
+    Imports and returns the model class for given ``module:Class`` spec.
+    """
+    try:
+        module_name, class_name = spec.split(':')
+    except ValueError:
+        raise ValueError(
+            'Model must be given as package.module:Model, got %r' % spec
+        )
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def count_nodes(node):
+    """
+    Returns the number of schema nodes in given schema, including itself.
+    """
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+
+def schema_depth(node):
+    """
+    Returns the nesting depth of given schema. A schema without children
+    has depth 1.
+    """
+    if not node.children:
+        return 1
+    return 1 + max(schema_depth(child) for child in node.children)
+
+
+def estimate_size(node):
+    """
+    Returns a rough estimate of the memory used by given schema in bytes.
+
+    Only the nodes, their attribute dicts, types and validators are
+    counted, so the result is a lower bound.
+    """
+    size = sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+    size += sys.getsizeof(node.typ)
+    if node.validator is not None:
+        size += sys.getsizeof(node.validator)
+    return size + sum(estimate_size(child) for child in node.children)
+
+
+def _recording_generator(generator_cls, generators):
+    class RecordingGenerator(generator_cls):
+        def __init__(self, *args, **kwargs):
+            super(RecordingGenerator, self).__init__(*args, **kwargs)
+            generators.append(self)
+
+    return RecordingGenerator
+
+
+def profile_schemas(model, number=10):
+    """
+    Builds every schema variant of given model once to warm up and then
+    ``number`` times for timing. Returns a list of dicts with generation
+    time (in seconds, averaged), node count, depth, estimated size and
+    skipped columns for each variant.
+    """
+    if number < 1:
+        raise ValueError('number must be at least 1, got %r' % number)
+    generators = []
+    generator_cls = model.__schema_generator__
+    overridden = '__schema_generator__' in model.__dict__
+    model.__schema_generator__ = _recording_generator(
+        generator_cls, generators
+    )
+    try:
+        results = []
+        for variant in VARIANTS:
+            factory = getattr(model, variant)
+            # Build the variant once before timing so that one-off costs
+            # such as SQLAlchemy mapper configuration are not measured.
+            # Relation schemas may create generators of their own, so the
+            # model's generator is looked up by its model class.
+            first = len(generators)
+            factory()
+            generator = [
+                g for g in generators[first:] if g.model_class is model
+            ][0]
+            start = default_timer()
+            for i in range(number):
+                schema = factory()
+            elapsed = (default_timer() - start) / number
+            results.append({
+                'variant': variant,
+                'time': elapsed,
+                'nodes': count_nodes(schema),
+                'depth': schema_depth(schema),
+                'size': estimate_size(schema),
+                'skipped': sorted(generator.skipped_columns)
+            })
+        return results
+    finally:
+        if overridden:
+            model.__schema_generator__ = generator_cls
+        else:
+            del model.__schema_generator__
+
+
+def profile_deserialize(schema, payload):
+    """
+    Deserializes given payload field by field and returns a list of
+    ``(name, seconds, error)`` tuples, where ``error`` is the error message
+    of a failed field or ``None``.
+    """
+    results = []
+    for node in schema.children:
+        cstruct = payload.get(node.name, colander.null)
+        error = None
+        start = default_timer()
+        try:
+            node.deserialize(cstruct)
+        except colander.Invalid as e:
+            error = '; '.join(
+                '%s: %s' % item for item in sorted(e.asdict().items())
+            )
+        results.append((node.name, default_timer() - start, error))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m colander_alchemy.profile',
+        description='Profile the colander schemas of a mapped model.'
+    )
+    parser.add_argument('model', help='model to profile, as module:Model')
+    parser.add_argument(
+        '-n', '--number', type=int, default=10,
+        help='how many times each schema is generated (default: 10)'
+    )
+    parser.add_argument(
+        '--payload',
+        help='JSON file with a sample payload to deserialize'
+    )
+    parser.add_argument(
+        '--variant', choices=VARIANTS, default='schema',
+        help='schema variant used for the sample payload (default: schema)'
+    )
+    args = parser.parse_args(argv)
+    if args.number < 1:
+        parser.error('--number must be at least 1')
+
+    try:
+        model = load_model(args.model)
+    except (ImportError, AttributeError, ValueError) as e:
+        parser.error(str(e))
+    if not inspect.isclass(model) or \
+            not issubclass(model, ColanderAlchemyMixin):
+        parser.error('%r is not a ColanderAlchemyMixin model' % args.model)
+
+    payload = None
+    if args.payload:
+        try:
+            with open(args.payload) as f:
+                payload = json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            parser.error('Could not read payload: %s' % e)
+        if not isinstance(payload, dict):
+            parser.error('Payload must be a JSON object')
+
+    print('%-20s %10s %6s %6s %10s  %s' % (
+        'variant', 'time (ms)', 'nodes', 'depth', 'size (B)', 'skipped'
+    ))
+    for row in profile_schemas(model, args.number):
+        print('%-20s %10.3f %6d %6d %10d  %s' % (
+            row['variant'],
+            row['time'] * 1000,
+            row['nodes'],
+            row['depth'],
+            row['size'],
+            ', '.join(row['skipped'])
+        ))
+
+    if payload is not None:
+        schema = getattr(model, args.variant)()
+        print('')
+        print('%-30s %10s  %s' % ('field', 'time (ms)', 'error'))
+        total = 0
+        for name, elapsed, error in profile_deserialize(schema, payload):
+            total += elapsed
+            print('%-30s %10.3f  %s' % (name, elapsed * 1000, error or ''))
+        print('%-30s %10.3f' % ('total', total * 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,10 @@
 from datetime import datetime
 
+try:
+    from UserDict import UserDict
+except ImportError:
+    from collections import UserDict
+
 import colander
 from pytest import raises
 from colander import Range, required, Length, OneOf, All, Email, null
@@ -11,8 +16,10 @@ from sqlalchemy.ext.declarative import declarative_base
 
 from colander_alchemy import (
     ColanderAlchemyMixin,
+    profile,
     NaiveDateTime,
     NullableSchemaNode,
+    PartialSchemaNode,
     SchemaGenerator,
     UnknownTypeException,
     missing,
@@ -91,6 +98,28 @@ class ColanderSchemaTestModel(Base, ColanderAlchemyMixin):
     }
 
 
+class ProfileNode(Base, ColanderAlchemyMixin):
+    __tablename__ = 'profile_node'
+    id = sa.Column(BigInteger, autoincrement=True, primary_key=True)
+    type = sa.Column(sa.Unicode(20))
+    secret = sa.Column(sa.Integer)
+    child_id = sa.Column(None, sa.ForeignKey('profile_node.id'))
+
+    child = orm.relationship(
+        lambda: ProfileChild, remote_side=[id], foreign_keys=[child_id]
+    )
+
+    __mapper_args__ = {'polymorphic_on': type, 'polymorphic_identity': 'node'}
+    __schema__ = {'secret': {'readonly': True}, 'child': {}}
+
+
+class ProfileChild(ProfileNode):
+    extra = sa.Column(sa.Integer)
+
+    __mapper_args__ = {'polymorphic_identity': 'child'}
+    __schema__ = {'extra': {'readonly': True}}
+
+
 class ColanderMixinTestCase(object):
     def find_field(self,
                    field,
@@ -293,3 +322,306 @@ class TestTypeConversion(ColanderMixinTestCase):
         with raises(UnknownTypeException):
             SchemaGenerator(ColanderSchemaTestModel) \
                 .convert_type(UnknownType())
+
+
+class TestPayloadBudget(object):
+    def create_schema(self, **kwargs):
+        generator = SchemaGenerator(
+            ColanderSchemaTestModel, missing=missing, **kwargs
+        )
+        return generator.create()
+
+    def test_no_budget_by_default(self):
+        schema = ColanderSchemaTestModel.schema(missing=missing)
+        assert schema.budget is None
+
+    def test_rejects_payload_over_max_size(self):
+        schema = self.create_schema(max_size=20)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'text_field': 'a' * 100})
+        assert e.value.asdict() == {
+            'text_field': 'Payload larger than maximum size 20'
+        }
+
+    def test_rejects_payload_over_max_depth(self):
+        schema = self.create_schema(max_depth=2)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({
+                'whitelisted_relation': {'text_field': {'a': 'b'}}
+            })
+        assert e.value.asdict() == {
+            'whitelisted_relation.text_field':
+            'Payload nested deeper than maximum depth 2'
+        }
+
+    def test_rejects_sequence_over_max_length(self):
+        schema = self.create_schema(max_sequence_length=2)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'text_field': ['a', 'b', 'c']})
+        assert e.value.asdict() == {
+            'text_field': 'Sequence longer than maximum length 2'
+        }
+
+    def test_string_limit_defaults_to_column_length(self):
+        schema = self.create_schema(max_string_length=1000)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'unicode_field2': 'a' * 21})
+        assert e.value.asdict() == {
+            'unicode_field2': 'String longer than maximum length 20'
+        }
+
+    def test_rejects_string_over_max_string_length(self):
+        schema = self.create_schema(max_string_length=10)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'text_field': 'a' * 11})
+        assert e.value.asdict() == {
+            'text_field': 'String longer than maximum length 10'
+        }
+
+    def test_charges_empty_containers_to_max_size(self):
+        schema = self.create_schema(max_size=100)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'text_field': [[]] * 100000})
+        assert e.value.asdict() == {
+            'text_field': 'Payload larger than maximum size 100'
+        }
+
+    def test_rejects_deeply_nested_payload_without_max_depth(self):
+        cstruct = []
+        for i in range(5000):
+            cstruct = [cstruct]
+        schema = self.create_schema(max_size=100)
+        with raises(colander.Invalid):
+            schema.deserialize({'text_field': cstruct})
+        schema = self.create_schema(max_string_length=1)
+        with raises(colander.Invalid):
+            schema.budget.check(schema, {'text_field': [cstruct, 'ab']})
+
+    def test_string_limit_is_smaller_of_column_length_and_budget(self):
+        schema = self.create_schema(max_string_length=10)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'unicode_field': 'a' * 200})
+        assert e.value.asdict() == {
+            'unicode_field': 'String longer than maximum length 10'
+        }
+
+    def test_checks_other_mapping_types(self):
+        schema = self.create_schema(max_string_length=1)
+        with raises(colander.Invalid):
+            schema.deserialize(UserDict({'text_field': 'abcdef'}))
+
+    def test_keeps_error_keys_of_length_validator(self):
+        cstruct = {'unicode_field2': 'a' * 21}
+        with raises(colander.Invalid) as e:
+            self.create_schema().deserialize(cstruct)
+        keys = set(e.value.asdict().keys())
+        with raises(colander.Invalid) as e:
+            self.create_schema(max_size=10 ** 6).deserialize(cstruct)
+        assert set(e.value.asdict().keys()) == keys == set(['unicode_field2'])
+
+    def test_reports_unknown_path_in_message(self):
+        schema = self.create_schema(max_depth=2)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'unknown': {'a': {'b': 1}}})
+        assert e.value.asdict() == {
+            '': 'unknown.a: Payload nested deeper than maximum depth 2'
+        }
+
+    def test_rejects_keys_over_max_string_length(self):
+        schema = self.create_schema(max_string_length=3)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'a' * 100000: 'b'})
+        assert e.value.asdict() == {'': 'Key longer than maximum length 3'}
+
+    def test_accepts_payload_within_budget(self):
+        schema = self.create_schema(
+            max_size=100,
+            max_depth=2,
+            max_sequence_length=2,
+            max_string_length=10
+        )
+        result = schema.deserialize({
+            'integer_field': '1',
+            'text_field': 'text',
+            'whitelisted_relation': {'text_field': 'related'}
+        })
+        assert result['text_field'] == 'text'
+        assert result['whitelisted_relation']['text_field'] == 'related'
+
+    def test_mixin_passes_schema_budget(self):
+        class BudgetedModel(Base, ColanderAlchemyMixin):
+            __tablename__ = 'budgeted_model'
+            __schema_budget__ = {'max_string_length': 5}
+            id = sa.Column(BigInteger, autoincrement=True, primary_key=True)
+            text_field = sa.Column(sa.Text)
+
+        with raises(colander.Invalid):
+            BudgetedModel.get_update_schema().deserialize(
+                {'text_field': 'a' * 6}
+            )
+
+
+class TestProfile(object):
+    def test_load_model(self):
+        model = profile.load_model('colander_alchemy:ColanderAlchemyMixin')
+        assert model is ColanderAlchemyMixin
+
+    def test_load_model_requires_colon(self):
+        with raises(ValueError):
+            profile.load_model('colander_alchemy')
+
+    def test_rejects_number_below_one(self):
+        with raises(SystemExit):
+            profile.main(['colander_alchemy:ColanderAlchemyMixin', '-n', '0'])
+
+    def test_rejects_payload_that_is_not_an_object(self, tmpdir):
+        payload = tmpdir.join('payload.json')
+        payload.write('[1, 2]')
+        with raises(SystemExit):
+            profile.main([
+                'colander_alchemy:ColanderAlchemyMixin',
+                '--payload', str(payload)
+            ])
+
+    def test_profiles_every_schema_variant(self):
+        results = profile.profile_schemas(ColanderSchemaTestModel, number=1)
+        assert [row['variant'] for row in results] == list(profile.VARIANTS)
+        for row in results:
+            assert row['nodes'] > 1
+            assert row['depth'] >= 2
+            assert row['size'] > 0
+
+    def test_reports_skipped_columns(self):
+        results = profile.profile_schemas(ColanderSchemaTestModel, number=1)
+        assert 'read_only_field' in results[0]['skipped']
+        assert 'id' in results[0]['skipped']
+        assert 'id' not in results[-1]['skipped']
+        assert 'time_field' in results[-1]['skipped']
+
+    def test_reports_skipped_columns_of_profiled_model(self):
+        results = profile.profile_schemas(ProfileNode, number=1)
+        assert 'secret' in results[0]['skipped']
+        assert 'extra' not in results[0]['skipped']
+
+    def test_rejects_models_without_mixin(self):
+        with raises(SystemExit):
+            profile.main(['colander:SchemaNode'])
+
+    def test_rejects_missing_payload_file(self, tmpdir):
+        with raises(SystemExit):
+            profile.main([
+                'colander_alchemy:ColanderAlchemyMixin',
+                '--payload', str(tmpdir.join('missing.json'))
+            ])
+
+    def test_rejects_malformed_payload(self, tmpdir):
+        payload = tmpdir.join('payload.json')
+        payload.write('{')
+        with raises(SystemExit):
+            profile.main([
+                'colander_alchemy:ColanderAlchemyMixin',
+                '--payload', str(payload)
+            ])
+
+    def test_restores_schema_generator(self):
+        profile.profile_schemas(ColanderSchemaTestModel, number=1)
+        assert '__schema_generator__' not in ColanderSchemaTestModel.__dict__
+        assert ColanderSchemaTestModel.__schema_generator__ is SchemaGenerator
+
+    def test_profile_deserialize(self):
+        schema = ColanderSchemaTestModel.get_update_schema()
+        results = profile.profile_deserialize(
+            schema, {'integer_field': 'a', 'text_field': 'text'}
+        )
+        errors = dict((name, error) for name, elapsed, error in results)
+        assert errors['text_field'] is None
+        assert errors['integer_field'] == 'integer_field: "a" is not a number'
+        assert len(results) == len(schema.children)
+
+    def test_profile_deserialize_reports_nested_paths(self):
+        schema = ColanderSchemaTestModel.schema()
+        results = profile.profile_deserialize(
+            schema, {'whitelisted_relation': {'integer_field': 'a'}}
+        )
+        errors = dict((name, error) for name, elapsed, error in results)
+        assert errors['whitelisted_relation'] == (
+            'whitelisted_relation.integer_field: "a" is not a number'
+        )
+
+
+class TestPartialUpdateSchema(object):
+    def test_not_partial_by_default(self):
+        schema = ColanderSchemaTestModel.get_update_schema()
+        assert not isinstance(schema, PartialSchemaNode)
+
+    def test_returns_only_submitted_fields(self):
+        schema = ColanderSchemaTestModel.get_update_schema(partial=True)
+        assert schema.deserialize({'integer_field': '5'}) == {
+            'integer_field': 5
+        }
+
+    def test_supports_other_mapping_types(self):
+        schema = ColanderSchemaTestModel.get_update_schema(partial=True)
+        assert schema.deserialize(UserDict({'text_field': 'a'})) == {
+            'text_field': 'a'
+        }
+
+    def test_leaves_out_dropped_fields(self):
+        schema = ColanderSchemaTestModel.get_update_schema(
+            partial=True, missing=colander.drop
+        )
+        assert schema.deserialize({'integer_field': ''}) == {}
+
+    def test_ignores_unknown_fields(self):
+        schema = ColanderSchemaTestModel.get_update_schema(partial=True)
+        assert schema.deserialize({'unknown': 1}) == {}
+
+    def test_reports_errors_of_submitted_fields(self):
+        schema = ColanderSchemaTestModel.get_update_schema(partial=True)
+        with raises(colander.Invalid) as e:
+            schema.deserialize({'field_with_range': '100', 'text_field': 'a'})
+        assert list(e.value.asdict().keys()) == ['field_with_range']
+
+    def test_skips_schema_validator_by_default(self):
+        def validator(node, value):
+            raise colander.Invalid(node, 'invalid')
+
+        schema = SchemaGenerator(
+            ColanderSchemaTestModel, validator=validator, partial=True
+        ).create()
+        assert schema.deserialize({'text_field': 'a'}) == {'text_field': 'a'}
+
+    def test_runs_schema_validator_when_requested(self):
+        def validator(node, value):
+            assert value == {'text_field': 'a'}
+            raise colander.Invalid(node, 'invalid')
+
+        schema = SchemaGenerator(
+            ColanderSchemaTestModel,
+            validator=validator,
+            partial=True,
+            partial_validate=True
+        ).create()
+        with raises(colander.Invalid):
+            schema.deserialize({'text_field': 'a'})
+
+    def test_index_follows_added_nodes(self):
+        schema = ColanderSchemaTestModel.get_update_schema(partial=True)
+        schema.deserialize({})
+        schema.add(colander.SchemaNode(colander.Integer(), name='extra'))
+        assert schema.deserialize({'extra': '1'}) == {'extra': 1}
+
+    def test_clone_uses_own_index(self):
+        schema = ColanderSchemaTestModel.get_update_schema(partial=True)
+        schema.deserialize({})
+        cloned = schema.clone()
+        cloned['text_field'].validator = Length(max=1)
+        with raises(colander.Invalid):
+            cloned.deserialize({'text_field': 'ab'})
+
+    def test_checks_payload_budget(self):
+        schema = SchemaGenerator(
+            ColanderSchemaTestModel, partial=True, max_string_length=1
+        ).create()
+        with raises(colander.Invalid):
+            schema.deserialize({'text_field': 'ab'})